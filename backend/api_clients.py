@@ -9,12 +9,110 @@ import json
 import logging
 import os
 import random
+import threading
+import time
+from collections import OrderedDict, deque
 
 import requests
 
 logger = logging.getLogger(__name__)
 
 
+def _pooled_session(user_agent=None):
+    """requests.Session with HTTP keepalive and a widened connection pool.
+
+    Reusing pooled connections skips the TCP+TLS handshake on repeat calls
+    to the same host.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=20, pool_maxsize=50)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    if user_agent:
+        session.headers.update({"User-Agent": user_agent})
+    return session
+
+
+# ── Circuit breaker ──────────────────────────────────────────────────────
+
+class CircuitBreaker:
+    """Fail-fast guard for a flaky external service.
+
+    closed: calls pass through, failures are counted in a rolling window.
+    open: calls are skipped until the cooldown elapses.
+    half-open: a couple of trial calls decide whether to close or re-open.
+
+    Clients in this module return None on failure instead of raising, so a
+    None result counts as a failure. Thread-safe.
+    """
+
+    def __init__(self, failure_threshold=5, window_seconds=30.0,
+                 cooldown_seconds=10.0, half_open_max_calls=2):
+        self._threshold = failure_threshold
+        self._window = window_seconds
+        self._cooldown = cooldown_seconds
+        self._half_open_max = half_open_max_calls
+        self._lock = threading.Lock()
+        self._failures = deque()
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+    @property
+    def state(self):
+        return self._state
+
+    def allow(self):
+        """Whether a call may proceed right now."""
+        with self._lock:
+            if self._state == "open":
+                if time.monotonic() - self._opened_at < self._cooldown:
+                    return False
+                self._state = "half_open"
+                self._half_open_calls = 0
+            if self._state == "half_open":
+                if self._half_open_calls >= self._half_open_max:
+                    return False
+                self._half_open_calls += 1
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = "closed"
+            self._failures.clear()
+
+    def record_failure(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == "half_open":
+                self._state = "open"
+                self._opened_at = now
+                self._failures.clear()
+                return
+            self._failures.append(now)
+            while self._failures and now - self._failures[0] > self._window:
+                self._failures.popleft()
+            if len(self._failures) >= self._threshold:
+                self._state = "open"
+                self._opened_at = now
+                self._failures.clear()
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker. Returns None without calling when open."""
+        if not self.allow():
+            return None
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record_failure()
+            raise
+        if result is None:
+            self.record_failure()
+        else:
+            self.record_success()
+        return result
+
+
 # ── Claude (Anthropic) ──────────────────────────────────────────────────
 
 class ClaudeClient:
@@ -42,7 +140,13 @@ class ClaudeClient:
             response = self._client.messages.create(
                 model=model,
                 max_tokens=max_tokens,
-                system=system_prompt,
+                # cache_control marks the static system prompt for Anthropic
+                # prompt caching — repeat requests skip re-processing it
+                system=[{
+                    "type": "text",
+                    "text": system_prompt,
+                    "cache_control": {"type": "ephemeral"},
+                }],
                 messages=[{"role": "user", "content": user_prompt}],
             )
             return response.content[0].text
@@ -79,6 +183,7 @@ class UnsplashClient:
 
     def __init__(self, access_key=None):
         self._access_key = access_key
+        self._session = _pooled_session()
 
     @property
     def is_available(self):
@@ -89,7 +194,7 @@ class UnsplashClient:
         if not self.is_available:
             return None
         try:
-            resp = requests.get(
+            resp = self._session.get(
                 f"{self.BASE_URL}/search/photos",
                 params={"query": query, "per_page": per_page, "orientation": "landscape"},
                 headers={"Authorization": f"Client-ID {self._access_key}"},
@@ -119,13 +224,14 @@ class RedditClient:
 
     TOKEN_URL = "https://www.reddit.com/api/v1/access_token"
     SEARCH_URL = "https://oauth.reddit.com/search"
-    DEFAULT_SUBREDDITS = ["science", "askscience", "EverythingScience", "Physics", "biology"]
+    DEFAULT_SUBREDDITS = ("science", "askscience", "EverythingScience", "Physics", "biology")
 
     def __init__(self, client_id=None, client_secret=None, user_agent="SciScroll/1.0"):
         self._client_id = client_id
         self._client_secret = client_secret
         self._user_agent = user_agent
         self._token = None
+        self._session = _pooled_session(user_agent)
 
     @property
     def is_available(self):
@@ -135,7 +241,7 @@ class RedditClient:
         if self._token:
             return self._token
         try:
-            resp = requests.post(
+            resp = self._session.post(
                 self.TOKEN_URL,
                 auth=(self._client_id, self._client_secret),
                 data={"grant_type": "client_credentials"},
@@ -158,7 +264,7 @@ class RedditClient:
             return None
         try:
             subreddit_filter = " OR ".join(f"subreddit:{s}" for s in self.DEFAULT_SUBREDDITS)
-            resp = requests.get(
+            resp = self._session.get(
                 self.SEARCH_URL,
                 params={"q": f"{query} ({subreddit_filter})", "sort": "relevance", "limit": limit, "type": "link"},
                 headers={"Authorization": f"Bearer {token}", "User-Agent": self._user_agent},
@@ -193,6 +299,7 @@ class TwitterClient:
 
     def __init__(self, bearer_token=None):
         self._bearer_token = bearer_token
+        self._session = _pooled_session()
 
     @property
     def is_available(self):
@@ -204,7 +311,7 @@ class TwitterClient:
             return None
         try:
             science_query = f"{query} (science OR research OR study) -is:retweet lang:en"
-            resp = requests.get(
+            resp = self._session.get(
                 self.SEARCH_URL,
                 params={
                     "query": science_query,
@@ -249,8 +356,7 @@ class WikipediaClient:
     SUMMARY_URL = "https://en.wikipedia.org/api/rest_v1/page/summary"
 
     def __init__(self):
-        self._session = requests.Session()
-        self._session.headers.update({"User-Agent": "SciScroll/1.0 (educational project)"})
+        self._session = _pooled_session("SciScroll/1.0 (educational project)")
 
     @property
     def is_available(self):
@@ -353,8 +459,7 @@ class WikimediaClient:
     API_URL = "https://commons.wikimedia.org/w/api.php"
 
     def __init__(self):
-        self._session = requests.Session()
-        self._session.headers.update({"User-Agent": "SciScroll/1.0 (educational project)"})
+        self._session = _pooled_session("SciScroll/1.0 (educational project)")
 
     @property
     def is_available(self):
@@ -453,6 +558,7 @@ class ImgflipClient:
         self._username = username
         self._password = password
         self._memes_cache = None
+        self._session = _pooled_session()
 
     @property
     def is_available(self):
@@ -462,7 +568,7 @@ class ImgflipClient:
         if self._memes_cache:
             return self._memes_cache
         try:
-            resp = requests.get(self.MEMES_URL, timeout=10)
+            resp = self._session.get(self.MEMES_URL, timeout=10)
             resp.raise_for_status()
             self._memes_cache = resp.json().get("data", {}).get("memes", [])
             return self._memes_cache
@@ -483,7 +589,7 @@ class ImgflipClient:
 
         if self.is_available and top_text and bottom_text:
             try:
-                resp = requests.post(
+                resp = self._session.post(
                     self.CAPTION_URL,
                     data={
                         "template_id": template["id"],
@@ -527,58 +633,62 @@ class XkcdClient:
 
     # Curated index of science-relevant xkcd comics by keyword
     SCIENCE_COMICS = {
-        "black hole": [2135, 1758],
-        "gravity": [681, 2735, 852],
-        "quantum": [1240, 1861, 2735, 1591],
-        "entanglement": [1591],
-        "physics": [793, 669, 730, 1489],
-        "space": [1356, 1939, 2333, 1110],
-        "astronomy": [1758, 2360, 2014],
-        "dna": [1605, 2131],
-        "gene": [1605, 2131],
-        "crispr": [2131],
-        "biology": [2131, 1605, 1430],
-        "evolution": [1605, 2300],
-        "climate": [1732, 2500, 1321],
-        "temperature": [1732, 2500],
-        "carbon": [1732],
-        "ocean": [1321, 2561],
-        "neural network": [2173, 1838],
-        "machine learning": [2173, 1838, 1425],
-        "ai": [2173, 1838, 948],
-        "computer": [2173, 1838, 378],
-        "math": [55, 435, 2042, 687],
-        "statistics": [2400, 552, 882],
-        "chemistry": [2561, 435],
-        "rocket": [1356, 2333],
-        "planet": [2360, 1071],
-        "star": [2360, 1758, 1071],
-        "dark matter": [2135],
-        "dark energy": [2135],
-        "cosmology": [2135, 2360],
-        "neutrino": [2360],
-        "particle": [2360, 793],
-        "energy": [1732, 2500, 1321],
-        "robot": [2128, 948],
-        "virus": [2287, 2355],
-        "vaccine": [2515],
-        "brain": [2173, 1838],
-        "universe": [2135, 482, 1071],
+        "black hole": (2135, 1758),
+        "gravity": (681, 2735, 852),
+        "quantum": (1240, 1861, 2735, 1591),
+        "entanglement": (1591,),
+        "physics": (793, 669, 730, 1489),
+        "space": (1356, 1939, 2333, 1110),
+        "astronomy": (1758, 2360, 2014),
+        "dna": (1605, 2131),
+        "gene": (1605, 2131),
+        "crispr": (2131,),
+        "biology": (2131, 1605, 1430),
+        "evolution": (1605, 2300),
+        "climate": (1732, 2500, 1321),
+        "temperature": (1732, 2500),
+        "carbon": (1732,),
+        "ocean": (1321, 2561),
+        "neural network": (2173, 1838),
+        "machine learning": (2173, 1838, 1425),
+        "ai": (2173, 1838, 948),
+        "computer": (2173, 1838, 378),
+        "math": (55, 435, 2042, 687),
+        "statistics": (2400, 552, 882),
+        "chemistry": (2561, 435),
+        "rocket": (1356, 2333),
+        "planet": (2360, 1071),
+        "star": (2360, 1758, 1071),
+        "dark matter": (2135,),
+        "dark energy": (2135,),
+        "cosmology": (2135, 2360),
+        "neutrino": (2360,),
+        "particle": (2360, 793),
+        "energy": (1732, 2500, 1321),
+        "robot": (2128, 948),
+        "virus": (2287, 2355),
+        "vaccine": (2515,),
+        "brain": (2173, 1838),
+        "universe": (2135, 482, 1071),
     }
 
     # Group keywords by science domain for domain-aware fallback
     DOMAIN_KEYWORDS = {
-        "physics": ["black hole", "gravity", "quantum", "entanglement", "physics",
+        "physics": ("black hole", "gravity", "quantum", "entanglement", "physics",
                      "dark matter", "dark energy", "cosmology", "neutrino", "particle",
-                     "energy", "space", "astronomy", "rocket", "planet", "star", "universe"],
-        "biology": ["dna", "gene", "crispr", "biology", "evolution", "virus", "vaccine", "brain"],
-        "climate": ["climate", "temperature", "carbon", "ocean"],
-        "cs": ["neural network", "machine learning", "ai", "computer", "robot"],
-        "math": ["math", "statistics", "chemistry"],
+                     "energy", "space", "astronomy", "rocket", "planet", "star", "universe"),
+        "biology": ("dna", "gene", "crispr", "biology", "evolution", "virus", "vaccine", "brain"),
+        "climate": ("climate", "temperature", "carbon", "ocean"),
+        "cs": ("neural network", "machine learning", "ai", "computer", "robot"),
+        "math": ("math", "statistics", "chemistry"),
     }
 
+    _COMIC_CACHE_MAX = 256
+
     def __init__(self):
         self._latest_num = None
+        self._comic_cache = OrderedDict()
+        self._session = _pooled_session()
 
     @property
     def is_available(self):
@@ -588,7 +698,7 @@ class XkcdClient:
         if self._latest_num:
             return self._latest_num
         try:
-            resp = requests.get(self.LATEST_URL, timeout=10)
+            resp = self._session.get(self.LATEST_URL, timeout=10)
             resp.raise_for_status()
             self._latest_num = resp.json()["num"]
             return self._latest_num
@@ -596,11 +706,16 @@ class XkcdClient:
             return 2900  # reasonable fallback
 
     def _fetch_comic(self, num):
+        # Published comics never change, so cache them for the process lifetime
+        cached = self._comic_cache.get(num)
+        if cached is not None:
+            self._comic_cache.move_to_end(num)
+            return dict(cached)
         try:
-            resp = requests.get(self.COMIC_URL.format(num=num), timeout=10)
+            resp = self._session.get(self.COMIC_URL.format(num=num), timeout=10)
             resp.raise_for_status()
             comic = resp.json()
-            return {
+            result = {
                 "url": comic["img"],
                 "source": "xkcd",
                 "attribution": f"xkcd #{comic['num']}: {comic['title']}",
@@ -609,6 +724,10 @@ class XkcdClient:
                 "alt_text": comic.get("alt", ""),
                 "title": comic.get("title", ""),
             }
+            self._comic_cache[num] = result
+            while len(self._comic_cache) > self._COMIC_CACHE_MAX:
+                self._comic_cache.popitem(last=False)
+            return dict(result)
         except Exception as e:
             logger.error("xkcd fetch error for #%s: %s", num, e)
             return None
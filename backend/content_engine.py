@@ -5,96 +5,147 @@ Handles engagement scoring, strategy selection, content block generation
 (live via Claude orchestration), and response validation.
 """
 
+import functools
+import itertools
 import json
 import logging
 import random
-import uuid
-from collections import deque
-
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from api_clients import CircuitBreaker
 from topic_graph import slugify, make_node
 
 logger = logging.getLogger(__name__)
 
 # ── Media types ───────────────────────────────────────────────────────────
-MEDIA_TYPES = ["unsplash", "wikipedia_image", "wikimedia", "reddit", "xkcd", "meme", "tweet"]
+MEDIA_TYPES = ("unsplash", "wikipedia_image", "wikimedia", "reddit", "xkcd", "meme", "tweet")
+
+# API client name → media type it serves
+API_TO_MEDIA = {
+    "unsplash": "unsplash",
+    "wikipedia": "wikipedia_image",
+    "wikimedia": "wikimedia",
+    "reddit": "reddit",
+    "xkcd": "xkcd",
+    "imgflip": "meme",
+    "twitter": "tweet",
+}
+
+VALID_GROUP_ROLES_TEXT = frozenset({"explanation", "caption", "context", "funfact"})
+VALID_GROUP_ROLES_MEDIA = frozenset({"visual", "diagram", "discussion", "humor", "social"})
+VALID_STRATEGIES = frozenset({"deeper", "branch", "pivot"})
+
+_MEDIA_TYPES_SET = frozenset(MEDIA_TYPES)
 
-VALID_GROUP_ROLES_TEXT = {"explanation", "caption", "context", "funfact"}
-VALID_GROUP_ROLES_MEDIA = {"visual", "diagram", "discussion", "humor", "social"}
-VALID_STRATEGIES = {"deeper", "branch", "pivot"}
+# Required keys per validated shape, as (ordered tuple, frozenset) pairs so
+# missing-key checks are one set difference with deterministic error order
+_REQUIRED_BLOCK_KEYS = ("id", "type", "content", "group_id", "group_role")
+_REQUIRED_BLOCK_KEY_SET = frozenset(_REQUIRED_BLOCK_KEYS)
+_REQUIRED_RESPONSE_KEYS = ("content_blocks", "next_nodes", "strategy_used", "engagement_score")
+_REQUIRED_RESPONSE_KEY_SET = frozenset(_REQUIRED_RESPONSE_KEYS)
+_REQUIRED_INITIAL_KEYS = ("content_blocks", "graph", "next_nodes", "strategy_used")
+_REQUIRED_INITIAL_KEY_SET = frozenset(_REQUIRED_INITIAL_KEYS)
 
 
 # ── Utility ───────────────────────────────────────────────────────────────
 
+_TLS = threading.local()
+
+# Shared pool for resolving media requests concurrently (blocking HTTP calls)
+_MEDIA_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="media")
+
+
+def _rng():
+    """Per-thread random.Random — avoids contention on the shared module RNG
+    under threaded workers, and lets tests seed deterministically."""
+    rng = getattr(_TLS, "rng", None)
+    if rng is None:
+        rng = _TLS.rng = random.Random()
+    return rng
+
+
 def _uid(prefix=""):
-    """Generate a short unique ID with an optional prefix."""
-    short = uuid.uuid4().hex[:8]
+    """Generate a short unique ID with an optional prefix.
+
+    One random base per thread plus a monotonic counter: a dozen block IDs
+    per request cost one OS RNG call per thread lifetime instead of each.
+    """
+    state = getattr(_TLS, "uid_state", None)
+    if state is None:
+        state = _TLS.uid_state = (secrets.token_hex(3), itertools.count())
+    base, counter = state
+    short = f"{base}{next(counter):02x}"
     return f"{prefix}-{short}" if prefix else short
 
 
+_TIME_DATA_DEFAULTS = {
+    "current_node_id": "",
+    "total_time_on_node_ms": 0,
+    "scroll_events": 0,
+    "go_deeper_clicks": 0,
+    "sections_in_current_node": 1,
+    "time_per_section_ms": 0,
+}
+
+
+def _nonneg_int(val, default):
+    """Coerce val to a non-negative int, using default for None/bad input."""
+    try:
+        val = int(val) if val is not None else default
+    except (ValueError, TypeError):
+        val = default
+    return val if val > 0 else 0
+
+
 def sanitize_time_data(time_data):
     """Sanitize and fill defaults for time_data from the frontend.
 
     Returns a clean dict with all required keys, safe types, and non-negative values.
+    Straight-line code (no key loop) since this runs on every scoring call.
     """
-    defaults = {
-        "current_node_id": "",
-        "total_time_on_node_ms": 0,
-        "scroll_events": 0,
-        "go_deeper_clicks": 0,
-        "sections_in_current_node": 1,
-        "time_per_section_ms": 0,
-    }
     if not isinstance(time_data, dict):
-        return dict(defaults)
-
-    result = {}
-    for key, default_val in defaults.items():
-        val = time_data.get(key, default_val)
-        if key == "current_node_id":
-            result[key] = str(val) if val is not None else ""
-        else:
-            try:
-                val = int(val) if val is not None else default_val
-            except (ValueError, TypeError):
-                val = default_val
-            result[key] = max(0, val)
+        return dict(_TIME_DATA_DEFAULTS)
 
+    node_id = time_data.get("current_node_id", "")
     # sections must be at least 1 to avoid division by zero
-    if result["sections_in_current_node"] < 1:
-        result["sections_in_current_node"] = 1
-
-    return result
+    sections = _nonneg_int(time_data.get("sections_in_current_node", 1), 1)
+    return {
+        "current_node_id": str(node_id) if node_id is not None else "",
+        "total_time_on_node_ms": _nonneg_int(time_data.get("total_time_on_node_ms", 0), 0),
+        "scroll_events": _nonneg_int(time_data.get("scroll_events", 0), 0),
+        "go_deeper_clicks": _nonneg_int(time_data.get("go_deeper_clicks", 0), 0),
+        "sections_in_current_node": sections if sections >= 1 else 1,
+        "time_per_section_ms": _nonneg_int(time_data.get("time_per_section_ms", 0), 0),
+    }
 
 
 # ── Engagement scoring ────────────────────────────────────────────────────
 
-def compute_engagement_score(time_data):
-    """Compute an engagement score from 0.0 to 1.0 based on time_data.
-
-    Weighted formula:
-    - 0.30 × time factor (30s = 0.5, 60s+ = 1.0)
-    - 0.20 × scroll factor (capped at 10)
-    - 0.30 × click factor (each click adds 0.5, capped at 1.0)
-    - 0.20 × section-variance factor (time_per_section / total * sections)
-    """
-    td = sanitize_time_data(time_data)
-
+@functools.lru_cache(maxsize=1024)
+def _engagement_score_from(time_ms, scrolls, clicks, sections, time_per_section):
+    """Core engagement formula over sanitized scalar signals. Cached — the
+    frontend resends identical heartbeat payloads during polling."""
     # Time factor: 0-60s maps to 0-1
-    time_ms = td["total_time_on_node_ms"]
     time_factor = min(1.0, time_ms / 60000.0)
 
     # Scroll factor: 0-10 scrolls maps to 0-1
-    scroll_factor = min(1.0, td["scroll_events"] / 10.0)
+    scroll_factor = min(1.0, scrolls / 10.0)
 
     # Click factor: each go_deeper_click adds 0.5, capped at 1.0
-    click_factor = min(1.0, td["go_deeper_clicks"] * 0.5)
+    click_factor = min(1.0, clicks * 0.5)
 
     # Section variance: how evenly time is distributed across sections
-    sections = td["sections_in_current_node"]
-    total_time = td["total_time_on_node_ms"]
-    time_per_section = td["time_per_section_ms"]
-    if total_time > 0 and sections > 0:
-        expected_per_section = total_time / sections
+    if time_ms > 0 and sections > 0:
+        expected_per_section = time_ms / sections
         if expected_per_section > 0:
             variance_factor = min(1.0, time_per_section / expected_per_section)
         else:
@@ -112,6 +163,82 @@ def compute_engagement_score(time_data):
     return round(max(0.0, min(1.0, score)), 4)
 
 
+def compute_engagement_score(time_data):
+    """Compute an engagement score from 0.0 to 1.0 based on time_data.
+
+    Weighted formula:
+    - 0.30 × time factor (30s = 0.5, 60s+ = 1.0)
+    - 0.20 × scroll factor (capped at 10)
+    - 0.30 × click factor (each click adds 0.5, capped at 1.0)
+    - 0.20 × section-variance factor (time_per_section / total * sections)
+    """
+    td = sanitize_time_data(time_data)
+
+    # Bounce fast-path: with zero time, scrolls, and clicks every factor is 0
+    if (
+        td["total_time_on_node_ms"] == 0
+        and td["scroll_events"] == 0
+        and td["go_deeper_clicks"] == 0
+    ):
+        return 0.0
+
+    return _engagement_score_from(
+        td["total_time_on_node_ms"],
+        td["scroll_events"],
+        td["go_deeper_clicks"],
+        td["sections_in_current_node"],
+        td["time_per_section_ms"],
+    )
+
+
+def compute_engagement_scores_batch(time_data_list):
+    """Compute engagement scores for a list of time_data dicts at once.
+
+    Vectorized with NumPy when available (analytics/backtesting workloads
+    scoring thousands of sessions); falls back to per-item scoring otherwise.
+    Returns a list of floats in input order, identical to mapping
+    compute_engagement_score over the list.
+    """
+    if np is None or not time_data_list:
+        return [compute_engagement_score(td) for td in time_data_list]
+
+    sanitized = [sanitize_time_data(td) for td in time_data_list]
+    arr = np.array(
+        [
+            [
+                td["total_time_on_node_ms"],
+                td["scroll_events"],
+                td["go_deeper_clicks"],
+                td["sections_in_current_node"],
+                td["time_per_section_ms"],
+            ]
+            for td in sanitized
+        ],
+        dtype=np.float64,
+    )
+
+    time_factor = np.minimum(1.0, arr[:, 0] / 60000.0)
+    scroll_factor = np.minimum(1.0, arr[:, 1] / 10.0)
+    click_factor = np.minimum(1.0, arr[:, 2] * 0.5)
+
+    # sections is clamped to >= 1 by sanitize_time_data, so this never divides by zero
+    expected_per_section = arr[:, 0] / arr[:, 3]
+    variance_factor = np.where(
+        expected_per_section > 0,
+        np.minimum(1.0, arr[:, 4] / np.maximum(expected_per_section, 1e-9)),
+        0.0,
+    )
+
+    scores = (
+        0.30 * time_factor
+        + 0.20 * scroll_factor
+        + 0.30 * click_factor
+        + 0.20 * variance_factor
+    )
+    scores = np.clip(scores, 0.0, 1.0)
+    return [round(float(s), 4) for s in scores]
+
+
 def select_strategy(engagement_score):
     """Select a content strategy based on engagement score.
 
@@ -133,32 +260,37 @@ class MediaVarietyTracker:
     """Cycles through media types to ensure variety. No consecutive duplicates."""
 
     def __init__(self, media_types=None):
-        self._types = list(media_types or MEDIA_TYPES)
-        self._queue = deque(self._types)
-        self._last = None
+        self._types = tuple(media_types or MEDIA_TYPES)
+        self._order = list(range(len(self._types)))
+        _rng().shuffle(self._order)
+        self._cursor = 0
+        self._last_idx = -1
 
     def next_type(self):
         """Get the next media type, avoiding consecutive duplicates."""
-        if not self._queue:
-            shuffled = list(self._types)
-            random.shuffle(shuffled)
-            self._queue = deque(shuffled)
-
-        media_type = self._queue.popleft()
-
-        # Avoid consecutive duplicates
-        attempts = 0
-        while media_type == self._last and len(self._types) > 1 and attempts < len(self._types):
-            self._queue.append(media_type)
-            media_type = self._queue.popleft()
-            attempts += 1
-
-        self._last = media_type
-        return media_type
+        n = len(self._types)
+        idx = self._order[self._cursor]
+        self._cursor += 1
+        if self._cursor >= n:
+            _rng().shuffle(self._order)
+            self._cursor = 0
+
+        # Avoid consecutive duplicates across reshuffle boundaries
+        if idx == self._last_idx and n > 1:
+            idx = (idx + 1) % n
+
+        self._last_idx = idx
+        return self._types[idx]
+
+    def reset(self):
+        """Forget history and reshuffle, as if freshly constructed."""
+        _rng().shuffle(self._order)
+        self._cursor = 0
+        self._last_idx = -1
 
     @property
     def last(self):
-        return self._last
+        return self._types[self._last_idx] if self._last_idx >= 0 else None
 
 
 
@@ -230,6 +362,68 @@ STRATEGY BEHAVIOR:
 
 Return ONLY valid JSON, no markdown formatting."""
 
+_USER_PROMPT_TMPL = """Topic: {topic}
+Strategy: {strategy}
+Engagement Score: {score}
+Visited Nodes: {visited}
+Last Paragraph: {last_paragraph}
+
+Available media types: {media_types}
+
+Generate educational content following the {strategy} strategy.
+Suggest 2-4 next_nodes the user hasn't visited yet."""
+
+_EMPTY_JSON_LIST = "[]"
+
+
+class PlanCache:
+    """Small TTL'd LRU for Claude content plans.
+
+    Keyed on the prompt inputs so repeat/near-duplicate requests skip the
+    multi-second Claude round-trip entirely. Thread-safe.
+    """
+
+    def __init__(self, maxsize=128, ttl_seconds=300):
+        self._entries = OrderedDict()
+        self._maxsize = maxsize
+        self._ttl = ttl_seconds
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached plan for key, or None if missing/expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, plan = entry
+            if time.monotonic() - stored_at > self._ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return plan
+
+    def put(self, key, plan):
+        """Store a plan, evicting the least-recently-used entry when full."""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), plan)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+
+_PLAN_CACHE = PlanCache()
+
+
+def _plan_cache_key(topic_label, strategy, visited_nodes, engagement_score):
+    """Cache key for a Claude plan. Engagement is bucketed to one decimal so
+    near-identical heartbeat scores share an entry."""
+    return (
+        topic_label,
+        strategy,
+        tuple(sorted(visited_nodes or ())),
+        round(engagement_score, 1),
+    )
+
 
 def generate_content_with_claude(
     topic_label,
@@ -247,38 +441,53 @@ def generate_content_with_claude(
     if not claude_client or not claude_client.is_available:
         return None
 
+    cache_key = _plan_cache_key(topic_label, strategy, visited_nodes, engagement_score)
+    cached_plan = _PLAN_CACHE.get(cache_key)
+    if cached_plan is not None:
+        return cached_plan
+
     # Filter available_apis to only ones that are True
     apis_available = [name for name, avail in available_apis.items() if avail and name != "claude"]
+    available_media_types = [API_TO_MEDIA[api] for api in apis_available if api in API_TO_MEDIA]
 
-    # Map API names to media types
-    api_to_media = {
-        "unsplash": "unsplash",
-        "wikipedia": "wikipedia_image",
-        "wikimedia": "wikimedia",
-        "reddit": "reddit",
-        "xkcd": "xkcd",
-        "imgflip": "meme",
-        "twitter": "tweet",
-    }
-    available_media_types = [api_to_media[api] for api in apis_available if api in api_to_media]
-
-    user_prompt = f"""Topic: {topic_label}
-Strategy: {strategy}
-Engagement Score: {engagement_score}
-Visited Nodes: {json.dumps(list(visited_nodes or []))}
-Last Paragraph: {last_paragraph or "None (first content)"}
-
-Available media types: {json.dumps(available_media_types)}
-
-Generate educational content following the {strategy} strategy.
-Suggest 2-4 next_nodes the user hasn't visited yet."""
+    user_prompt = _USER_PROMPT_TMPL.format(
+        topic=topic_label,
+        strategy=strategy,
+        score=engagement_score,
+        visited=json.dumps(list(visited_nodes)) if visited_nodes else _EMPTY_JSON_LIST,
+        last_paragraph=last_paragraph or "None (first content)",
+        media_types=json.dumps(available_media_types),
+    )
 
-    result = claude_client.generate_json(CLAUDE_SYSTEM_PROMPT, user_prompt)
+    result = _CLAUDE_BREAKER.call(claude_client.generate_json, CLAUDE_SYSTEM_PROMPT, user_prompt)
     if result and isinstance(result, dict) and "groups" in result:
+        _PLAN_CACHE.put(cache_key, result)
         return result
     return None
 
 
+def _prefetch_next_plan(topic_label, strategy, visited_nodes, engagement_score,
+                        available_apis, claude_client):
+    """Pre-generate the Claude plan for a likely next hop in the background.
+
+    Runs off the request thread; the result lands in the plan cache via
+    generate_content_with_claude, so the follow-up request skips the Claude
+    round-trip on a hit. Failures are ignored — this is purely speculative.
+    """
+    try:
+        generate_content_with_claude(
+            topic_label=topic_label,
+            strategy=strategy,
+            visited_nodes=visited_nodes,
+            last_paragraph=None,
+            engagement_score=engagement_score,
+            available_apis=available_apis,
+            claude_client=claude_client,
+        )
+    except Exception as e:
+        logger.debug("Speculative plan prefetch failed for '%s': %s", topic_label, e)
+
+
 def _clean_query_for_wikipedia(query, topic_label):
     """Clean a Claude-generated query for Wikipedia API compatibility.
 
@@ -293,38 +502,51 @@ def _clean_query_for_wikipedia(query, topic_label):
     return topic_label
 
 
+# Per-service circuit breakers: repeated failures fail-fast instead of
+# pinning request threads on the full HTTP timeout every time
+_MEDIA_BREAKERS = {mt: CircuitBreaker() for mt in MEDIA_TYPES}
+_CLAUDE_BREAKER = CircuitBreaker()
+
+
 def _resolve_media(media_request, topic_label, api_clients):
     """Execute a media request from Claude's plan using real API clients.
 
-    Returns a media dict or None if the API call fails.
+    Returns a media dict or None if the API call fails or the service's
+    circuit breaker is open.
     """
     if not media_request or not isinstance(media_request, dict):
         return None
 
     media_type = media_request.get("type", "unsplash")
     query = media_request.get("query", topic_label)
+    breaker = _MEDIA_BREAKERS.get(media_type)
+    if breaker is None:
+        return None
     result = None
 
     try:
         if media_type == "unsplash" and api_clients.get("unsplash"):
-            result = api_clients["unsplash"].search_photos(query)
+            result = breaker.call(api_clients["unsplash"].search_photos, query)
         elif media_type == "wikipedia_image" and api_clients.get("wikipedia"):
             # Clean the query to match Wikipedia article titles
             clean_query = _clean_query_for_wikipedia(query, topic_label)
-            result = api_clients["wikipedia"].get_page_image(clean_query)
+            result = breaker.call(api_clients["wikipedia"].get_page_image, clean_query)
         elif media_type == "wikimedia" and api_clients.get("wikimedia"):
-            result = api_clients["wikimedia"].search_diagrams(query)
+            result = breaker.call(api_clients["wikimedia"].search_diagrams, query)
         elif media_type == "reddit" and api_clients.get("reddit"):
-            result = api_clients["reddit"].search_posts(query)
+            result = breaker.call(api_clients["reddit"].search_posts, query)
         elif media_type == "xkcd" and api_clients.get("xkcd"):
-            result = api_clients["xkcd"].search_comics(query)
+            result = breaker.call(api_clients["xkcd"].search_comics, query)
         elif media_type == "meme" and api_clients.get("imgflip"):
             # Pass Claude's generated captions to Imgflip
             top_text = media_request.get("top_text")
             bottom_text = media_request.get("bottom_text")
-            result = api_clients["imgflip"].get_meme(query, top_text=top_text, bottom_text=bottom_text)
+            result = breaker.call(
+                api_clients["imgflip"].get_meme, query,
+                top_text=top_text, bottom_text=bottom_text,
+            )
         elif media_type == "tweet" and api_clients.get("twitter"):
-            result = api_clients["twitter"].search_tweets(query)
+            result = breaker.call(api_clients["twitter"].search_tweets, query)
     except Exception as e:
         logger.warning("API call failed for %s: %s", media_type, e)
 
@@ -375,7 +597,16 @@ def generate_content_blocks(
     blocks = []
     groups = claude_plan.get("groups", [])
 
-    for group_data in groups:
+    # Resolve all media requests concurrently: each is a blocking HTTP call,
+    # so wall time drops from sum(latencies) to roughly max(latencies).
+    media_futures = [
+        _MEDIA_POOL.submit(_resolve_media, group_data.get("media_request"), topic_label, api_clients)
+        if group_data.get("media_request")
+        else None
+        for group_data in groups
+    ]
+
+    for group_data, media_future in zip(groups, media_futures):
         group_id = _uid("grp")
 
         # Text block
@@ -391,10 +622,10 @@ def generate_content_blocks(
             blocks.append(text_block)
 
         # Media block — skip if API returns nothing
-        media_request = group_data.get("media_request")
-        if media_request:
+        if media_future is not None:
+            media_request = group_data["media_request"]
             media_type = media_request.get("type", "unsplash")
-            media_data = _resolve_media(media_request, topic_label, api_clients)
+            media_data = media_future.result()
 
             if media_data is not None:
                 media_block = {
@@ -407,8 +638,13 @@ def generate_content_blocks(
                 }
                 blocks.append(media_block)
 
-    # Next nodes from Claude's plan — now full dicts with id/label/description
-    visited_set = set(visited_nodes or [])
+    # Next nodes from Claude's plan — now full dicts with id/label/description.
+    # Reuse the caller's set if it already is one; long sessions carry 100+ ids.
+    visited_set = (
+        visited_nodes
+        if isinstance(visited_nodes, (set, frozenset))
+        else frozenset(visited_nodes or ())
+    )
     claude_next = claude_plan.get("next_nodes", [])
     next_nodes = []
     for node_data in claude_next:
@@ -436,6 +672,19 @@ def generate_content_blocks(
             make_node(f"Beyond {label}", f"Topics related to {label}"),
         ]
 
+    # Speculatively warm the plan cache for the most likely next hop so the
+    # follow-up request can skip its Claude round-trip
+    if next_nodes and next_nodes[0].get("label"):
+        _MEDIA_POOL.submit(
+            _prefetch_next_plan,
+            next_nodes[0]["label"],
+            strategy,
+            frozenset(visited_set | {topic_id}),
+            engagement_score,
+            available_apis,
+            claude_client,
+        )
+
     return blocks, next_nodes
 
 
@@ -486,17 +735,16 @@ def validate_content_block(block):
     if not isinstance(block, dict):
         return ["Block is not a dict"]
 
-    required = ["id", "type", "content", "group_id", "group_role"]
-    for key in required:
-        if key not in block:
-            errors.append(f"Missing key: {key}")
+    missing = _REQUIRED_BLOCK_KEY_SET - block.keys()
+    if missing:
+        errors.extend(f"Missing key: {key}" for key in _REQUIRED_BLOCK_KEYS if key in missing)
 
     if "type" in block:
         block_type = block["type"]
         if block_type == "text":
             if block.get("group_role") and block["group_role"] not in VALID_GROUP_ROLES_TEXT:
                 errors.append(f"Invalid text group_role: {block['group_role']}")
-        elif block_type in MEDIA_TYPES:
+        elif block_type in _MEDIA_TYPES_SET:
             if block.get("group_role") and block["group_role"] not in VALID_GROUP_ROLES_MEDIA:
                 errors.append(f"Invalid media group_role: {block['group_role']}")
             if "media" not in block:
@@ -520,10 +768,9 @@ def validate_response(response):
     if not isinstance(response, dict):
         return ["Response is not a dict"]
 
-    required = ["content_blocks", "next_nodes", "strategy_used", "engagement_score"]
-    for key in required:
-        if key not in response:
-            errors.append(f"Missing key: {key}")
+    missing = _REQUIRED_RESPONSE_KEY_SET - response.keys()
+    if missing:
+        errors.extend(f"Missing key: {key}" for key in _REQUIRED_RESPONSE_KEYS if key in missing)
 
     if "strategy_used" in response and response["strategy_used"] not in VALID_STRATEGIES:
         errors.append(f"Invalid strategy: {response['strategy_used']}")
@@ -557,10 +804,9 @@ def validate_initial_response(response):
     if not isinstance(response, dict):
         return ["Response is not a dict"]
 
-    required = ["content_blocks", "graph", "next_nodes", "strategy_used"]
-    for key in required:
-        if key not in response:
-            errors.append(f"Missing key: {key}")
+    missing = _REQUIRED_INITIAL_KEY_SET - response.keys()
+    if missing:
+        errors.extend(f"Missing key: {key}" for key in _REQUIRED_INITIAL_KEYS if key in missing)
 
     if "strategy_used" in response and response["strategy_used"] != "deeper":
         errors.append(f"Initial strategy should be 'deeper', got: {response['strategy_used']}")
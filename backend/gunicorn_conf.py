@@ -0,0 +1,18 @@
+"""
+Gunicorn configuration for SciScroll production deploys.
+
+Run with:
+    gunicorn -c gunicorn_conf.py "server:create_app()"
+
+Handlers spend most of their time waiting on Claude and the media APIs,
+so threaded workers give high concurrency without extra processes.
+"""
+
+import multiprocessing
+
+bind = "0.0.0.0:5050"
+workers = 2 * multiprocessing.cpu_count() + 1
+worker_class = "gthread"
+threads = 8
+worker_connections = 1000
+timeout = 60
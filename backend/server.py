@@ -5,14 +5,24 @@ Flask REST API for SciScroll backend.
 - POST /api/initial  — Start exploring a topic
 - POST /api/generate — Get next content based on engagement
 - GET  /api/health   — Status check
+
+Production: gunicorn -c gunicorn_conf.py "server:create_app()"
+(the app.run block below is for local development only).
 """
 
 import os
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from api_clients import create_api_clients, get_available_apis
 from content_engine import (
     compute_engagement_score,
@@ -28,10 +38,31 @@ from topic_graph import slugify
 logger = logging.getLogger(__name__)
 
 
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson — much faster than stdlib json for the
+    large content_blocks payloads this API returns."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def _validate_and_log(validator, result, label):
+    """Run a response validator and log any errors. Validation never changes
+    the response, so it runs on a background thread off the request path."""
+    errors = validator(result)
+    if errors:
+        logger.error("%s response validation failed: %s", label, errors)
+
+
 def create_app(testing=False):
     """Flask application factory."""
     app = Flask(__name__)
     CORS(app)
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
 
     if not testing:
         from dotenv import load_dotenv
@@ -46,6 +77,7 @@ def create_app(testing=False):
         logger.info("Running in LIVE mode (Claude orchestration active)")
 
     app.api_clients = api_clients
+    app.validation_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="validate")
 
     # ── Input validation helpers ──────────────────────────────────────
 
@@ -72,12 +104,16 @@ def create_app(testing=False):
 
     # ── Routes ────────────────────────────────────────────────────────
 
+    # API availability is fixed at startup, so the health payload never
+    # changes — serialize it once and replay the bytes on every probe.
+    health_body = app.json.dumps({
+        "status": "ok",
+        "available_apis": get_available_apis(api_clients),
+    })
+
     @app.route("/api/health", methods=["GET"])
     def health():
-        return jsonify({
-            "status": "ok",
-            "available_apis": get_available_apis(app.api_clients),
-        })
+        return Response(health_body, mimetype="application/json")
 
     @app.route("/api/initial", methods=["POST"])
     def initial():
@@ -98,10 +134,8 @@ def create_app(testing=False):
             if result is None:
                 return jsonify({"error": "Content generation failed — Claude returned no content"}), 502
 
-            errors = validate_initial_response(result)
-            if errors:
-                logger.error("Initial response validation failed: %s", errors)
-                # Still return the result but log the issues
+            # Validation only logs — run it off the request path
+            app.validation_executor.submit(_validate_and_log, validate_initial_response, result, "Initial")
         except Exception as e:
             logger.exception("Error generating initial content")
             return jsonify({"error": f"Content generation failed: {str(e)}"}), 500
@@ -162,14 +196,13 @@ def create_app(testing=False):
 
             result = {
                 "content_blocks": content_blocks,
-                "next_nodes": [{"id": n["id"], "label": n["label"]} for n in next_nodes] if next_nodes and isinstance(next_nodes[0], dict) and "label" in next_nodes[0] else next_nodes,
+                "next_nodes": [{"id": n["id"], "label": n["label"]} for n in next_nodes],
                 "strategy_used": strategy,
                 "engagement_score": engagement_score,
             }
 
-            errors = validate_response(result)
-            if errors:
-                logger.error("Generate response validation failed: %s", errors)
+            # Validation only logs — run it off the request path
+            app.validation_executor.submit(_validate_and_log, validate_response, result, "Generate")
 
         except Exception as e:
             logger.exception("Error generating content")
@@ -197,4 +230,6 @@ def create_app(testing=False):
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     app = create_app()
-    app.run(debug=True, port=5050)
+    # threaded=True lets the dev server overlap requests that are blocked on
+    # Claude or the media APIs instead of pinning a single worker thread.
+    app.run(debug=True, port=5050, threaded=True)
@@ -1,19 +1,35 @@
-"""Tests for SciScroll backend — all live API calls, no mocking."""
+"""Tests for SciScroll backend — all live API calls, no mocking.
 
+The suite is xdist-friendly: run with `pytest -n auto` to spread the live
+HTTP tests across workers. Each endpoint class is pinned to one worker via
+xdist_group so it shares the module-scoped client.
+"""
+
+import copy
 import os
 import sys
 import json
+from operator import itemgetter
+
 import pytest
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 sys.path.insert(0, os.path.dirname(__file__))
 
 from topic_graph import slugify, make_node
 from content_engine import (
     sanitize_time_data,
     compute_engagement_score,
+    compute_engagement_scores_batch,
     select_strategy,
+    generate_content_blocks,
     MediaVarietyTracker,
     MEDIA_TYPES,
+    PlanCache,
     validate_content_block,
     validate_response,
     validate_initial_response,
@@ -21,26 +37,38 @@ from content_engine import (
     VALID_GROUP_ROLES_MEDIA,
     VALID_STRATEGIES,
 )
+from api_clients import CircuitBreaker
 from server import create_app
 
 
+def post_json(client, url, payload):
+    """POST a payload as JSON, serialized with orjson when available.
+
+    The client's json= kwarg goes through the stdlib encoder; orjson cuts
+    the serialization cost for the repeated session-test bodies.
+    """
+    data = orjson.dumps(payload) if orjson is not None else json.dumps(payload)
+    return client.post(url, data=data, content_type="application/json")
+
+
 # ── Fixtures ─────────────────────────────────────────────────────────────
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def app():
-    """Create test Flask app with real API clients (loads .env)."""
+    """Create test Flask app once per session with real API clients (loads .env)."""
     test_app = create_app(testing=False)
     test_app.config["TESTING"] = True
     return test_app
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def client(app):
-    """Flask test client."""
+    """Flask test client, shared across the module — tests don't rely on
+    per-test client state (no cookies/sessions), so one instance is enough."""
     return app.test_client()
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def high_engagement_time_data():
     """Simulates a highly engaged user: long time, many scrolls, clicks."""
     return {
@@ -53,7 +81,7 @@ def high_engagement_time_data():
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def moderate_engagement_time_data():
     """Simulates moderate engagement: some time, some scrolling."""
     return {
@@ -66,7 +94,7 @@ def moderate_engagement_time_data():
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def low_engagement_time_data():
     """Simulates a disengaged user: quick bounce, minimal interaction."""
     return {
@@ -79,7 +107,7 @@ def low_engagement_time_data():
     }
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def zero_engagement_time_data():
     """Simulates zero engagement: all zeros."""
     return {
@@ -127,6 +155,13 @@ class TestSlugify:
     def test_multiple_spaces_and_dashes(self):
         assert slugify("dark   matter--stuff") == "dark-matter-stuff"
 
+    def test_repeated_labels_served_from_cache(self):
+        """slugify is lru_cached — repeated labels must not rerun the regex."""
+        slugify("Gravitational Waves")
+        hits_before = slugify.cache_info().hits
+        slugify("Gravitational Waves")
+        assert slugify.cache_info().hits == hits_before + 1
+
 
 # ═══════════════════════════════════════════════════════════════════════════
 # TestMakeNode (4 tests)
@@ -274,8 +309,7 @@ class TestEngagementScoring:
             "sections_in_current_node": 2,
             "time_per_section_ms": 5000,
         }
-        with_clicks = dict(base)
-        with_clicks["go_deeper_clicks"] = 2
+        with_clicks = {**base, "go_deeper_clicks": 2}
         assert compute_engagement_score(with_clicks) > compute_engagement_score(base)
 
     def test_scroll_boost(self):
@@ -286,8 +320,7 @@ class TestEngagementScoring:
             "sections_in_current_node": 2,
             "time_per_section_ms": 5000,
         }
-        with_scrolls = dict(base)
-        with_scrolls["scroll_events"] = 8
+        with_scrolls = {**base, "scroll_events": 8}
         assert compute_engagement_score(with_scrolls) > compute_engagement_score(base)
 
     def test_time_boost(self):
@@ -298,9 +331,7 @@ class TestEngagementScoring:
             "sections_in_current_node": 2,
             "time_per_section_ms": 2500,
         }
-        with_time = dict(base)
-        with_time["total_time_on_node_ms"] = 50000
-        with_time["time_per_section_ms"] = 25000
+        with_time = {**base, "total_time_on_node_ms": 50000, "time_per_section_ms": 25000}
         assert compute_engagement_score(with_time) > compute_engagement_score(base)
 
     def test_determinism(self, high_engagement_time_data):
@@ -321,8 +352,7 @@ class TestEngagementScoring:
             "time_per_section_ms": 4115,
         }
         score = compute_engagement_score(data)
-        decimals = str(score).split(".")[-1]
-        assert len(decimals) <= 4
+        assert round(score, 4) == score
 
     def test_none_input(self):
         score = compute_engagement_score(None)
@@ -330,27 +360,71 @@ class TestEngagementScoring:
 
 
 # ═══════════════════════════════════════════════════════════════════════════
-# TestStrategySelection (6 tests)
+# TestBatchScoring (4 tests)
 # ═══════════════════════════════════════════════════════════════════════════
 
-class TestStrategySelection:
-    def test_high_engagement_deeper(self):
-        assert select_strategy(0.8) == "deeper"
-
-    def test_moderate_engagement_branch(self):
-        assert select_strategy(0.5) == "branch"
+class TestBatchScoring:
+    def test_matches_scalar_scores(self, high_engagement_time_data,
+                                   moderate_engagement_time_data,
+                                   low_engagement_time_data,
+                                   zero_engagement_time_data):
+        batch = [
+            high_engagement_time_data,
+            moderate_engagement_time_data,
+            low_engagement_time_data,
+            zero_engagement_time_data,
+        ]
+        scores = compute_engagement_scores_batch(batch)
+        assert scores == [compute_engagement_score(td) for td in batch]
+
+    def test_empty_list(self):
+        assert compute_engagement_scores_batch([]) == []
+
+    def test_malformed_entries(self):
+        batch = [None, "not a dict", {}, {"total_time_on_node_ms": -5}]
+        scores = compute_engagement_scores_batch(batch)
+        assert scores == [0.0, 0.0, 0.0, 0.0]
+
+    def test_returns_floats(self, high_engagement_time_data):
+        scores = compute_engagement_scores_batch([high_engagement_time_data] * 3)
+        assert all(isinstance(s, float) for s in scores)
+
+    def test_numpy_path_matches_scalar_grid(self):
+        """One vectorized pass over a grid of signal combinations must agree
+        with the scalar formula row-for-row."""
+        np = pytest.importorskip("numpy")
+        batch = [
+            {
+                "total_time_on_node_ms": t,
+                "scroll_events": s,
+                "go_deeper_clicks": c,
+                "sections_in_current_node": 4,
+                "time_per_section_ms": t // 4,
+            }
+            for t in (0, 5000, 30000, 60000, 120000)
+            for s in (0, 3, 10, 25)
+            for c in (0, 1, 2, 5)
+        ]
+        scores = compute_engagement_scores_batch(batch)
+        expected = [compute_engagement_score(td) for td in batch]
+        assert np.allclose(scores, expected)
 
-    def test_low_engagement_pivot(self):
-        assert select_strategy(0.2) == "pivot"
 
-    def test_boundary_065(self):
-        assert select_strategy(0.65) == "deeper"
-
-    def test_boundary_035(self):
-        assert select_strategy(0.35) == "branch"
+# ═══════════════════════════════════════════════════════════════════════════
+# TestStrategySelection (6 tests)
+# ═══════════════════════════════════════════════════════════════════════════
 
-    def test_zero(self):
-        assert select_strategy(0.0) == "pivot"
+class TestStrategySelection:
+    @pytest.mark.parametrize("score, expected", [
+        (0.8, "deeper"),    # high engagement
+        (0.5, "branch"),    # moderate engagement
+        (0.2, "pivot"),     # low engagement
+        (0.65, "deeper"),   # deeper boundary
+        (0.35, "branch"),   # branch boundary
+        (0.0, "pivot"),     # zero
+    ])
+    def test_strategy_for_score(self, score, expected):
+        assert select_strategy(score) == expected
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -358,30 +432,37 @@ class TestStrategySelection:
 # ═══════════════════════════════════════════════════════════════════════════
 
 class TestMediaVariety:
-    def test_cycles_through_types(self):
-        tracker = MediaVarietyTracker()
-        seen = set()
+    @pytest.fixture(scope="module")
+    def tracker(self):
+        """One default tracker for the class; reset between tests below."""
+        return MediaVarietyTracker()
+
+    @pytest.fixture(autouse=True)
+    def _reset_tracker(self, tracker):
+        tracker.reset()
+
+    def test_cycles_through_types(self, tracker):
+        # Coverage as a bitmask — one bit per media type
+        idx = {t: 1 << i for i, t in enumerate(MEDIA_TYPES)}
+        mask = 0
         for _ in range(len(MEDIA_TYPES) * 2):
-            seen.add(tracker.next_type())
-        assert seen == set(MEDIA_TYPES)
+            mask |= idx[tracker.next_type()]
+        assert mask == (1 << len(MEDIA_TYPES)) - 1
 
-    def test_no_consecutive_duplicates(self):
-        tracker = MediaVarietyTracker()
+    def test_no_consecutive_duplicates(self, tracker):
         prev = None
         for _ in range(50):
             current = tracker.next_type()
             assert current != prev, f"Consecutive duplicate: {current}"
             prev = current
 
-    def test_all_types_covered(self):
-        tracker = MediaVarietyTracker()
+    def test_all_types_covered(self, tracker):
         seen = set()
         for _ in range(len(MEDIA_TYPES)):
             seen.add(tracker.next_type())
         assert len(seen) == len(MEDIA_TYPES)
 
-    def test_tracker_last_property(self):
-        tracker = MediaVarietyTracker()
+    def test_tracker_last_property(self, tracker):
         assert tracker.last is None
         t = tracker.next_type()
         assert tracker.last == t
@@ -399,6 +480,78 @@ class TestMediaVariety:
             assert tracker.next_type() == "only"
 
 
+# ═══════════════════════════════════════════════════════════════════════════
+# TestCircuitBreaker (5 tests)
+# ═══════════════════════════════════════════════════════════════════════════
+
+class TestCircuitBreaker:
+    def test_starts_closed_and_passes_calls(self):
+        breaker = CircuitBreaker()
+        assert breaker.state == "closed"
+        assert breaker.call(lambda: "ok") == "ok"
+
+    def test_opens_after_repeated_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3)
+        for _ in range(3):
+            breaker.call(lambda: None)
+        assert breaker.state == "open"
+
+    def test_open_skips_calls(self):
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=60.0)
+        breaker.call(lambda: None)
+        calls = []
+        assert breaker.call(lambda: calls.append(1) or "ok") is None
+        assert calls == []
+
+    def test_half_open_success_closes(self):
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=0.0)
+        breaker.call(lambda: None)
+        assert breaker.call(lambda: "recovered") == "recovered"
+        assert breaker.state == "closed"
+
+    def test_exception_counts_as_failure(self):
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=60.0)
+
+        def boom():
+            raise ValueError("down")
+
+        with pytest.raises(ValueError):
+            breaker.call(boom)
+        assert breaker.state == "open"
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+# TestPlanCache (4 tests)
+# ═══════════════════════════════════════════════════════════════════════════
+
+class TestPlanCache:
+    def test_miss_returns_none(self):
+        cache = PlanCache()
+        assert cache.get(("black holes", "deeper", (), 0.7)) is None
+
+    def test_put_then_get(self):
+        cache = PlanCache()
+        plan = {"groups": [], "next_nodes": []}
+        key = ("black holes", "deeper", (), 0.7)
+        cache.put(key, plan)
+        assert cache.get(key) is plan
+
+    def test_expired_entry_evicted(self):
+        cache = PlanCache(ttl_seconds=0)
+        key = ("black holes", "deeper", (), 0.7)
+        cache.put(key, {"groups": []})
+        assert cache.get(key) is None
+
+    def test_lru_eviction_at_maxsize(self):
+        cache = PlanCache(maxsize=2)
+        cache.put("a", {"groups": [1]})
+        cache.put("b", {"groups": [2]})
+        cache.put("c", {"groups": [3]})
+        assert cache.get("a") is None
+        assert cache.get("b") is not None
+        assert cache.get("c") is not None
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 # TestValidation (9 tests)
 # ═══════════════════════════════════════════════════════════════════════════
@@ -494,6 +647,8 @@ class TestValidation:
 # ═══════════════════════════════════════════════════════════════════════════
 
 class TestHealthEndpoint:
+    pytestmark = pytest.mark.xdist_group(name="health_endpoint")
+
     def test_health_returns_200(self, client):
         resp = client.get("/api/health")
         assert resp.status_code == 200
@@ -522,6 +677,8 @@ class TestHealthEndpoint:
 # ═══════════════════════════════════════════════════════════════════════════
 
 class TestInitialEndpoint:
+    pytestmark = pytest.mark.xdist_group(name="initial_endpoint")
+
     def test_success_known_topic(self, client):
         resp = client.post("/api/initial", json={"topic": "Black Holes"})
         assert resp.status_code == 200
@@ -615,6 +772,8 @@ class TestInitialEndpoint:
 # ═══════════════════════════════════════════════════════════════════════════
 
 class TestGenerateEndpoint:
+    pytestmark = pytest.mark.xdist_group(name="generate_endpoint")
+
     def test_success_high_engagement(self, client, high_engagement_time_data):
         resp = client.post("/api/generate", json={
             "current_node": "Black Holes",
@@ -796,24 +955,79 @@ class TestGenerateEndpoint:
 # TestSimulatedFrontendSession (9 tests)
 # ═══════════════════════════════════════════════════════════════════════════
 
+# Initial content per topic, fetched once per test run — every session test
+# re-posts the same handful of topics and each miss is a full Claude
+# round-trip. Deep-copied on return so tests can't mutate the cache.
+_INITIAL_CACHE = {}
+
+# Engagement payloads for the strategy-shift test, built once at import
+_HIGH_ENGAGE_INLINE = {
+    "total_time_on_node_ms": 60000, "scroll_events": 12,
+    "go_deeper_clicks": 2, "sections_in_current_node": 4, "time_per_section_ms": 15000,
+}
+_LOW_ENGAGE_INLINE = {
+    "total_time_on_node_ms": 2000, "scroll_events": 0,
+    "go_deeper_clicks": 0, "sections_in_current_node": 4, "time_per_section_ms": 500,
+}
+
+# Extracting block/node ids is the hottest comprehension in the session
+# tests; itemgetter + map keeps the loop in C.
+_get_id = itemgetter("id")
+
+# Generate-request body shape, copied (C-level) per call instead of
+# rebuilding the dict literal
+_GENERATE_BODY_TPL = {"current_node": None, "time_data": None, "visited_nodes": None}
+
+
 class TestSimulatedFrontendSession:
     """Simulates a real frontend session: initial -> multiple generates with
     accumulating visited_nodes, shifting engagement, growing graph."""
 
+    pytestmark = pytest.mark.xdist_group(name="frontend_session")
+
     def _initial(self, client, topic="Black Holes"):
-        resp = client.post("/api/initial", json={"topic": topic})
-        assert resp.status_code == 200
-        return resp.get_json()
+        cached = _INITIAL_CACHE.get(topic)
+        if cached is None:
+            resp = post_json(client, "/api/initial", {"topic": topic})
+            assert resp.status_code == 200
+            cached = _INITIAL_CACHE[topic] = resp.get_json()
+        return copy.deepcopy(cached)
 
     def _generate(self, client, current_node, time_data, visited_nodes):
-        resp = client.post("/api/generate", json={
-            "current_node": current_node,
-            "time_data": time_data,
-            "visited_nodes": visited_nodes,
-        })
+        body = _GENERATE_BODY_TPL.copy()
+        body["current_node"] = current_node
+        body["time_data"] = time_data
+        body["visited_nodes"] = visited_nodes
+        resp = post_json(client, "/api/generate", body)
         assert resp.status_code == 200
         return resp.get_json()
 
+    def _generate_direct(self, app, current_node, time_data, visited_nodes):
+        """Call the engine directly, skipping the WSGI layer.
+
+        Assembles the same payload shape as /api/generate. Used by tests that
+        assert on content, not HTTP semantics — one HTTP test per strategy
+        keeps the route itself covered.
+        """
+        clean_time_data = sanitize_time_data(time_data)
+        engagement_score = compute_engagement_score(clean_time_data)
+        strategy = select_strategy(engagement_score)
+        content_blocks, next_nodes = generate_content_blocks(
+            topic_id=slugify(current_node),
+            strategy=strategy,
+            visited_nodes=visited_nodes,
+            last_paragraph="",
+            engagement_score=engagement_score,
+            api_clients=app.api_clients,
+        )
+        assert content_blocks is not None
+        return {
+            "content_blocks": content_blocks,
+            "next_nodes": [{"id": n["id"], "label": n["label"]} for n in next_nodes],
+            "strategy_used": strategy,
+            "engagement_score": engagement_score,
+        }
+
     def test_full_session_initial(self, client):
         """Step 1: Start with Black Holes."""
         data = self._initial(client)
@@ -840,62 +1054,65 @@ class TestSimulatedFrontendSession:
         data = self._generate(client, "Climate Science", low_engagement_time_data, ["climate-science"])
         assert data["strategy_used"] == "pivot"
 
-    def test_accumulating_visited_nodes(self, client, high_engagement_time_data):
+    def test_accumulating_visited_nodes(self, client, app, high_engagement_time_data):
         """Visited nodes grow over session, next_nodes shouldn't repeat."""
         init = self._initial(client)
-        visited = ["black-holes"]
+        visited = {"black-holes"}
 
         # Step 2
-        gen1 = self._generate(client, "Black Holes", high_engagement_time_data, visited)
-        visited.extend(n["id"] for n in gen1["next_nodes"])
+        gen1 = self._generate_direct(app, "Black Holes", high_engagement_time_data, visited)
+        visited.update(n["id"] for n in gen1["next_nodes"])
 
         # Step 3
-        gen2 = self._generate(client, "Black Holes", high_engagement_time_data, visited)
+        gen2 = self._generate_direct(app, "Black Holes", high_engagement_time_data, visited)
         gen2_next_ids = {n["id"] for n in gen2["next_nodes"]}
 
         # Next nodes should not include already-visited nodes
-        for v in visited:
-            assert v not in gen2_next_ids
-
-    def test_strategy_shifts_with_engagement(self, client):
+        assert visited.isdisjoint(gen2_next_ids)
+
+    def test_visited_nodes_accepts_frozenset(self, app, high_engagement_time_data):
+        """The engine contract accepts set-like visited_nodes, not just lists."""
+        gen = self._generate_direct(
+            app, "Black Holes", high_engagement_time_data,
+            frozenset({"black-holes", "hawking-radiation"}),
+        )
+        next_ids = {n["id"] for n in gen["next_nodes"]}
+        assert "hawking-radiation" not in next_ids
+
+    def test_strategy_shifts_with_engagement(self, client, app):
         """Strategy should change as engagement changes."""
         self._initial(client)
 
-        high = self._generate(client, "Black Holes", {
-            "total_time_on_node_ms": 60000, "scroll_events": 12,
-            "go_deeper_clicks": 2, "sections_in_current_node": 4, "time_per_section_ms": 15000
-        }, [])
+        high = self._generate_direct(app, "Black Holes", _HIGH_ENGAGE_INLINE, [])
 
-        low = self._generate(client, "Black Holes", {
-            "total_time_on_node_ms": 2000, "scroll_events": 0,
-            "go_deeper_clicks": 0, "sections_in_current_node": 4, "time_per_section_ms": 500
-        }, [])
+        low = self._generate_direct(app, "Black Holes", _LOW_ENGAGE_INLINE, [])
 
         assert high["strategy_used"] == "deeper"
         assert low["strategy_used"] == "pivot"
 
-    def test_graph_growth_over_session(self, client, high_engagement_time_data):
+    def test_graph_growth_over_session(self, client, app, high_engagement_time_data):
         """Graph should accumulate nodes over multiple requests."""
         init = self._initial(client)
         initial_node_count = len(init["graph"]["nodes"])
 
-        gen1 = self._generate(client, "Black Holes", high_engagement_time_data, ["black-holes"])
+        gen1 = self._generate_direct(app, "Black Holes", high_engagement_time_data, ["black-holes"])
         assert len(gen1["next_nodes"]) > 0
 
     def test_mixed_media_types(self, client, high_engagement_time_data):
         """Content should include diverse media types."""
         init = self._initial(client)
-        media_types = {b["type"] for b in init["content_blocks"] if b["type"] != "text"}
-        # Real APIs may not always return all types, but should have at least 1
-        assert len(media_types) >= 1, f"Expected media types, got: {media_types}"
+        # Real APIs may not always return all types, but at least one media
+        # block should be present — any() stops at the first hit
+        assert any(b["type"] != "text" for b in init["content_blocks"]), \
+            "Expected at least one media block"
 
-    def test_no_duplicate_block_ids(self, client, high_engagement_time_data):
+    def test_no_duplicate_block_ids(self, client, app, high_engagement_time_data):
         """Block IDs should be unique across the entire session."""
         init = self._initial(client)
-        all_ids = {b["id"] for b in init["content_blocks"]}
+        all_ids = set(map(_get_id, init["content_blocks"]))
 
-        gen1 = self._generate(client, "Black Holes", high_engagement_time_data, ["black-holes"])
-        gen1_ids = {b["id"] for b in gen1["content_blocks"]}
+        gen1 = self._generate_direct(app, "Black Holes", high_engagement_time_data, ["black-holes"])
+        gen1_ids = set(map(_get_id, gen1["content_blocks"]))
 
         # No overlap between initial and generated
         assert all_ids.isdisjoint(gen1_ids), "Block IDs should be unique across requests"
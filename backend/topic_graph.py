@@ -1,10 +1,12 @@
 """Utilities for topic graph node construction in SciScroll."""
 
+import functools
 import re
 
 
+@functools.lru_cache(maxsize=512)
 def slugify(text):
-    """Convert text to a URL-safe slug."""
+    """Convert text to a URL-safe slug. Cached — topics repeat across requests."""
     if not text or not text.strip():
         return ""
     s = text.lower().strip()